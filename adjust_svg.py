@@ -35,11 +35,21 @@ and is distributed under compatible terms.
 Author: ಪವನ ಕುಮಾರ ​| Pavan Kumar, PhD (@pvnkmrksk)
 """
 
+import math
+import os
+import re
 import sys
 import logging
+from collections import Counter
 from pathlib import Path
-import xml.etree.ElementTree as ET
-from typing import Union
+from typing import Optional, Union
+
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    HAVE_LXML = False
 
 # Configure logging
 logging.basicConfig(
@@ -48,59 +58,241 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# SVG namespace
+SVG_NS = {'svg': 'http://www.w3.org/2000/svg'}
+
+_TEXT_TAG = '{http://www.w3.org/2000/svg}text'
+_XML_NS = '{http://www.w3.org/XML/1998/namespace}'
+
+# Precompiled XPath, evaluated entirely inside libxml2. The predicate keeps
+# text elements without any font-size from ever reaching Python.
+if HAVE_LXML:
+    _TEXT_XPATH = ET.XPath(
+        "//svg:text[@font-size or contains(@style, 'font-size')]",
+        namespaces=SVG_NS
+    )
+
+# A whole font-size declaration inside an inline style (not e.g. "-x-font-size")
+_FONT_SIZE_RE = re.compile(r'(?<![\w-])(font-size\s*:\s*)([^;\s]*)')
+
+# libxml2 parser options for transit SVGs: no DTD loading, entity expansion
+# or network access, and no limits on very large documents
+_PARSER_OPTIONS = dict(
+    resolve_entities=False,
+    load_dtd=False,
+    no_network=True,
+    huge_tree=True,
+    remove_blank_text=False,
+)
+
+# Inputs larger than this are streamed instead of loaded as a full DOM
+STREAM_THRESHOLD = 64 * 1024 * 1024
+
+def _format_size(value: float) -> str:
+    """Format a scaled size at full precision, without a trailing '.0'"""
+    return format(value, '.15g')
+
+def _adjust_text_element(elem, scale_factor: float, skipped: Counter) -> int:
+    """
+    Scale font-size of a single text element, returning the number of adjustments.
+    
+    Unparsable sizes are tallied in skipped ('attr'/'style') rather than logged
+    one by one, so malformed maps don't pay for a log call per element.
+    """
+    attrib = elem.attrib
+    adjustment_count = 0
+    font_size = attrib.get('font-size')
+    if font_size is not None:
+        try:
+            value = float(font_size)
+        except ValueError:
+            value = math.nan
+        if not math.isfinite(value):
+            skipped['attr'] += 1
+            return adjustment_count
+        attrib['font-size'] = _format_size(value * scale_factor)
+        adjustment_count += 1
+    
+    # Also check style attribute for font-size
+    style = attrib.get('style')
+    match = _FONT_SIZE_RE.search(style) if style else None
+    if match is not None:
+        value = match.group(2)
+        unit = 'px' if value.endswith('px') else ''
+        try:
+            size = float(value[:len(value) - len(unit)])
+        except ValueError:
+            size = math.nan
+        if not math.isfinite(size):
+            skipped['style'] += 1
+        else:
+            # Rewrite the value in place, keeping the declaration order
+            new_size = _format_size(size * scale_factor)
+            attrib['style'] = f"{style[:match.end(1)]}{new_size}{unit}{style[match.end():]}"
+            adjustment_count += 1
+    
+    return adjustment_count
+
+def _release(node) -> None:
+    """Drop an already written node and its preceding siblings from the parse tree"""
+    node.clear()
+    parent = node.getparent()
+    if parent is not None:
+        while node.getprevious() is not None:
+            del parent[0]
+
+def _adjust_streaming(
+    input_file: Union[str, Path],
+    output_file: Union[str, Path],
+    scale_factor: float,
+    skipped: Counter
+) -> int:
+    """
+    Adjust text sizes by streaming the SVG through iterparse and xmlfile.
+    
+    Every node is written out as soon as it is complete and then released,
+    so memory stays flat regardless of the size of the map. Requires lxml.
+    xmlfile cannot write around the root element itself, so comments and
+    processing instructions before it are held until the doctype is out and
+    those after it are appended once the document is closed.
+    
+    Returns:
+        Number of adjusted font sizes
+    """
+    adjustment_count = 0
+    context = ET.iterparse(
+        str(input_file),
+        events=('start', 'end', 'comment', 'pi'),
+        **_PARSER_OPTIONS
+    )
+    
+    epilog = []  # comments and PIs after the root
+    with open(output_file, 'wb') as out:
+        with ET.xmlfile(out, encoding='utf-8') as xf:
+            xf.write_declaration()
+            open_elements = []   # stack of (node, xmlfile element, namespaces in scope)
+            pending_text = None  # started element whose text is not written yet
+            pending_tail = None  # finished node whose tail is not written yet
+            prolog = []          # comments and PIs before the root
+            root_started = False
+            
+            for event, node in context:
+                # Text and tails are only complete once the parser has moved on
+                if pending_text is not None:
+                    if pending_text.text:
+                        xf.write(pending_text.text)
+                    pending_text = None
+                if pending_tail is not None:
+                    if pending_tail.tail:
+                        xf.write(pending_tail.tail)
+                    _release(pending_tail)
+                    pending_tail = None
+                
+                if event == 'start':
+                    if not root_started:
+                        doctype = node.getroottree().docinfo.doctype
+                        if doctype:
+                            xf.write_doctype(doctype)
+                        for prolog_node in prolog:
+                            xf.write(prolog_node, with_tail=False)
+                            _release(prolog_node)
+                        prolog = []
+                        root_started = True
+                    if node.tag == _TEXT_TAG:
+                        adjustment_count += _adjust_text_element(node, scale_factor, skipped)
+                    
+                    # Only declare namespaces not already in scope. xmlfile does
+                    # not know the implicit xml prefix (xml:space etc.)
+                    scope = open_elements[-1][2] if open_elements else {}
+                    nsmap = {
+                        prefix: uri for prefix, uri in node.nsmap.items()
+                        if scope.get(prefix) != uri
+                    }
+                    attrib = dict(node.attrib)
+                    if 'xml' not in scope and any(k.startswith(_XML_NS) for k in attrib):
+                        nsmap['xml'] = _XML_NS[1:-1]
+                    if nsmap:
+                        scope = {**scope, **nsmap}
+                    
+                    element = xf.element(node.tag, attrib, nsmap=nsmap)
+                    element.__enter__()
+                    open_elements.append((node, element, scope))
+                    pending_text = node
+                elif event == 'end':
+                    _, element, _ = open_elements.pop()
+                    element.__exit__(None, None, None)
+                    pending_tail = node
+                elif not root_started:
+                    prolog.append(node)
+                elif not open_elements:
+                    epilog.append(node)
+                else:
+                    # Comments and processing instructions
+                    xf.write(node, with_tail=False)
+                    pending_tail = node
+        
+        for node in epilog:
+            out.write(b'\n' + ET.tostring(node, encoding='utf-8', with_tail=False))
+    
+    return adjustment_count
+
 def adjust_svg_text_sizes(
     input_file: Union[str, Path], 
     output_file: Union[str, Path], 
-    scale_factor: float
+    scale_factor: float,
+    stream: Optional[bool] = None
 ) -> None:
     """
-    Adjust text sizes in an SVG file using standard library XML parsing.
+    Adjust text sizes in an SVG file.
+
+    Uses lxml (libxml2) for parsing, XPath and serialization when available,
+    falling back to the standard library ElementTree otherwise.
     
     Args:
         input_file: Path to input SVG file
         output_file: Path to output SVG file
         scale_factor: Factor to scale text sizes by (e.g., 0.85 for 85%)
+        stream: Stream the file instead of building a DOM. Defaults to
+            streaming inputs larger than STREAM_THRESHOLD. Requires lxml.
     """
+    if not math.isfinite(scale_factor):
+        raise ValueError(f"Scale factor must be a finite number, got {scale_factor}")
+    
     try:
+        if stream is None:
+            stream = os.path.getsize(input_file) > STREAM_THRESHOLD
+        
         # Load and parse SVG file
         if logging.getLogger().isEnabledFor(logging.DEBUG):
             logger.info(f"Loading SVG file: {input_file}")
-        tree = ET.parse(input_file)
-        root = tree.getroot()
-        
-        # SVG namespace
-        ns = {'svg': 'http://www.w3.org/2000/svg'}
-        
-        # Find all elements with font-size attribute
-        adjustment_count = 0
-        for elem in root.findall('.//svg:text', ns):
-            try:
-                if 'font-size' in elem.attrib:
-                    current_size = float(elem.attrib['font-size'])
-                    new_size = current_size * scale_factor
-                    elem.attrib['font-size'] = str(new_size)
-                    adjustment_count += 1
-            except (ValueError, KeyError) as e:
-                logger.warning(f"Couldn't process text element: {e}")
-                continue
+        skipped = Counter()
+        if HAVE_LXML and stream:
+            adjustment_count = _adjust_streaming(
+                input_file, output_file, scale_factor, skipped
+            )
+        else:
+            if HAVE_LXML:
+                parser = ET.XMLParser(**_PARSER_OPTIONS)
+                tree = ET.parse(str(input_file), parser)
+                text_elements = _TEXT_XPATH(tree)
+            else:
+                tree = ET.parse(input_file)
+                text_elements = tree.getroot().findall('.//svg:text', SVG_NS)
+            
+            # Find all elements with font-size attribute
+            adjustment_count = 0
+            for elem in text_elements:
+                adjustment_count += _adjust_text_element(elem, scale_factor, skipped)
             
-            # Also check style attribute for font-size
-            if 'style' in elem.attrib:
-                style = elem.attrib['style']
-                style_dict = dict(s.split(':') for s in style.split(';') if ':' in s)
-                if 'font-size' in style_dict:
-                    try:
-                        current_size = float(style_dict['font-size'].rstrip('px'))
-                        new_size = current_size * scale_factor
-                        style_dict['font-size'] = f"{new_size}px"
-                        elem.attrib['style'] = ';'.join(f"{k}:{v}" for k, v in style_dict.items())
-                        adjustment_count += 1
-                    except ValueError as e:
-                        logger.warning(f"Couldn't process style font-size: {e}")
+            # Save the modified SVG
+            tree.write(str(output_file), encoding='utf-8', xml_declaration=True)
         
-        # Save the modified SVG
+        if skipped and logger.isEnabledFor(logging.WARNING):
+            logger.warning(
+                "Skipped %d attr / %d style font-size values",
+                skipped['attr'], skipped['style']
+            )
         logger.info(f"Adjusted {adjustment_count} text elements in {Path(output_file).name}")
-        tree.write(output_file, encoding='utf-8', xml_declaration=True)
         
     except Exception as e:
         logger.error(f"Error processing SVG file: {e}")
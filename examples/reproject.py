@@ -1,39 +1,82 @@
-import json
 import sys
 import math
 
+try:
+	import numpy as np
+	from numpy import arctan as atan, exp
+
+	def reproject_all(xs, ys):
+		lon, lat = reproject(np.array(xs, dtype=float), np.array(ys, dtype=float))
+		return np.column_stack((lon, lat)).tolist()
+except ImportError:
+	from math import atan, exp
+
+	def reproject_all(xs, ys):
+		return [list(reproject(x, y)) for x, y in zip(xs, ys)]
+
+try:
+	import orjson
+
+	def loads(raw):
+		return orjson.loads(raw)
+
+	def dumps(obj):
+		return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+	import json
+
+	def loads(raw):
+		return json.loads(raw)
+
+	def dumps(obj):
+		return json.dumps(obj, indent=2).encode('utf-8')
+
 # Opening JSON file
-f = open(sys.argv[1])
+f = open(sys.argv[1], 'rb')
 
 # returns JSON object as
 # a dictionary
-data = json.load(f)
+data = loads(f.read())
 
-def reproject(point):
+def reproject(x, y):
 	IRAD = 180.0 / math.pi
 
-	x = point[0]
-	y = point[1]
-	lat = (1.5707963267948966 - (2.0 * math.atan(math.exp(-y / 6378137.0)))) * IRAD
+	lat = (1.5707963267948966 - (2.0 * atan(exp(-y / 6378137.0)))) * IRAD
 	lon = x / 111319.4907932735677
-	return [lon, lat]
+	return lon, lat
 
-# Iterating through the json
-# list
+# Flatten every vertex into contiguous x/y arrays, remembering how
+# many vertices each geometry owns
+geometries = []
+xs = []
+ys = []
 for i in data['features']:
 	if i['geometry']['type'] == 'Point':
-		i['geometry']['coordinates'] = reproject(i['geometry']['coordinates'])
-		#  print(i)
-	if i['geometry']['type'] == 'LineString':
-		for c in range(len(i['geometry']['coordinates'])):
-			i['geometry']['coordinates'][c] = reproject(i['geometry']['coordinates'][c])
+		coords = [i['geometry']['coordinates']]
+	elif i['geometry']['type'] == 'LineString':
+		coords = i['geometry']['coordinates']
+	else:
+		continue
+	geometries.append((i['geometry'], len(coords)))
+	xs.extend(c[0] for c in coords)
+	ys.extend(c[1] for c in coords)
+
+# Reproject all vertices (at once with numpy) and hand the slices back
+points = reproject_all(xs, ys)
+start = 0
+for geometry, count in geometries:
+	if geometry['type'] == 'Point':
+		geometry['coordinates'] = points[start]
+	else:
+		geometry['coordinates'] = points[start:start + count]
+	start += count
 
 # Closing file
 f.close()
 
 # Serializing json
-json_object = json.dumps(data, indent=2)
+json_object = dumps(data)
 
 # Writing to sample.json
-with open(sys.argv[1] + ".new", "w") as outfile:
+with open(sys.argv[1] + ".new", "wb") as outfile:
     outfile.write(json_object)
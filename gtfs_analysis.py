@@ -42,11 +42,123 @@ Author: ಪವನ ಕುಮಾರ ​| Pavan Kumar, PhD (@pvnkmrksk)
 """
 
 import partridge as ptg
+from partridge.config import default_config, reroot_graph
+import networkx as nx
 import pandas as pd
-from typing import List, Set, Dict, Union
+from typing import List, Dict, Union
 from pathlib import Path
 import natsort
+import re
 import sys
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from gtfs_utils import HAVE_POLARS, file_fingerprint, stop_counts
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+def _to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Serialize a DataFrame to CSV, using pyarrow's multithreaded writer when available"""
+    # pyarrow quotes every string (and always the header) unless told not to
+    # quote at all, so write unquoted like to_csv and leave values with
+    # commas, quotes or line breaks to pandas, which quotes only those fields
+    if HAVE_PYARROW and not any(
+        char in str(column) for column in df.columns for char in ',"\r\n'
+    ):
+        buffer = pa.BufferOutputStream()
+        buffer.write(f"{','.join(map(str, df.columns))}\n".encode('utf-8'))
+        try:
+            pacsv.write_csv(
+                pa.Table.from_pandas(df, preserve_index=False), buffer,
+                pacsv.WriteOptions(include_header=False, quoting_style='none')
+            )
+            return buffer.getvalue().to_pybytes()
+        except pa.ArrowInvalid:
+            pass
+    return df.to_csv(index=False).encode('utf-8')
+
+def _raw_config():
+    """partridge config that keeps every value as the text in the feed"""
+    config = default_config()
+    for _, data in config.nodes(data=True):
+        data.pop('converters', None)
+        data.pop('transformations', None)
+    return config
+
+def _load_raw_feed(feed_path: str, cache_dir: Union[str, Path, None] = None) -> ptg.gtfs.Feed:
+    """
+    Load a feed keeping every value as text, optionally through a Parquet cache.
+    
+    With cache_dir (and pyarrow), the first load parses every table once and
+    stores it as Parquet under a fingerprint of the feed file; later loads of
+    the unchanged file read the Parquet tables instead of unpacking and
+    parsing the CSVs.
+    """
+    config = _raw_config()
+    if cache_dir is None or not HAVE_PYARROW:
+        return ptg.load_feed(feed_path, config=config)
+    
+    cache_path = Path(cache_dir, file_fingerprint(feed_path))
+    if not cache_path.is_dir():
+        feed = ptg.load_feed(feed_path, config=config)
+        # Fill a scratch directory first so an interrupted run leaves no
+        # partial cache behind
+        scratch = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        scratch.mkdir(parents=True, exist_ok=True)
+        try:
+            for filename in config.nodes():
+                pq.write_table(
+                    pa.Table.from_pandas(feed.get(filename), preserve_index=False),
+                    scratch / f"{filename}.parquet"
+                )
+            try:
+                os.replace(scratch, cache_path)
+            except OSError:
+                # Another process cached the same feed first
+                pass
+        finally:
+            # Gone after a successful rename; otherwise drop the partial tables
+            shutil.rmtree(scratch, ignore_errors=True)
+        return feed
+    
+    # The directory holds no .txt files, so nothing is ever read from it;
+    # every table is served from the cache set here
+    feed = ptg.gtfs.Feed(str(cache_path), config=config)
+    for filename in config.nodes():
+        feed.set(filename, pd.read_parquet(cache_path / f"{filename}.parquet"))
+    return feed
+
+def _typed_feed(raw_feed: ptg.gtfs.Feed) -> ptg.gtfs.Feed:
+    """
+    Typed view over a raw (unconverted) feed.
+    
+    partridge converts columns in place on the frame its source hands over,
+    which for unfiltered tables is the source's cached object. Reading through
+    an intermediate layer with no dependencies, whose get() caches a fresh
+    reset_index copy of each table, keeps the raw tables verbatim for writing
+    subsets.
+    """
+    passthrough = nx.DiGraph()
+    passthrough.add_nodes_from(default_config().nodes())
+    return ptg.gtfs.Feed(
+        ptg.gtfs.Feed(raw_feed, config=passthrough), config=default_config()
+    )
+
+@lru_cache(maxsize=32)
+def _wildcard_regex(patterns: tuple) -> re.Pattern:
+    """Compile route patterns with inner wildcards into one alternation, cached across subsets"""
+    return re.compile('|'.join(
+        '(?:{})'.format('.*'.join(re.escape(part) for part in pattern.split('*')))
+        for pattern in patterns
+    ))
 
 class GTFSAnalyzer:
     """
@@ -64,7 +176,8 @@ class GTFSAnalyzer:
     
     Attributes:
         feed_path (str): Path to the GTFS feed file
-        feed (partridge.Feed): Loaded GTFS feed object
+        feed (partridge.Feed): Loaded GTFS feed object. The analyses convert
+            the ID columns of its trips and stop_times tables to categoricals.
     
     Example:
         >>> analyzer = GTFSAnalyzer("input.zip")
@@ -76,10 +189,69 @@ class GTFSAnalyzer:
         ... )
     """
     
-    def __init__(self, feed_path: Union[str, Path]):
-        """Initialize with a GTFS feed path"""
+    def __init__(self, feed_path: Union[str, Path], use_polars: bool = True,
+                 cache_dir: Union[str, Path, None] = None):
+        """
+        Initialize with a GTFS feed path.
+        
+        With use_polars (and polars installed) the heavy stop aggregations run
+        in polars; results are returned as pandas DataFrames either way.
+        With cache_dir the parsed tables are kept as Parquet across runs.
+        """
         self.feed_path = str(feed_path)
-        self.feed = ptg.load_feed(self.feed_path)
+        # Every table is parsed once as text; the typed feed used for analysis
+        # and the views used for subsets are both derived from it
+        self._raw_feed = _load_raw_feed(self.feed_path, cache_dir)
+        self.feed = _typed_feed(self._raw_feed)
+        self.use_polars = use_polars and HAVE_POLARS
+        self._categorical_ids = False
+    
+    @classmethod
+    def _from_feed(cls, feed_path: Union[str, Path], raw_feed: ptg.gtfs.Feed,
+                   use_polars: bool = True) -> 'GTFSAnalyzer':
+        """Wrap a raw feed that is already in memory instead of parsing feed_path again"""
+        analyzer = cls.__new__(cls)
+        analyzer.feed_path = str(feed_path)
+        analyzer._raw_feed = raw_feed
+        analyzer.feed = _typed_feed(raw_feed)
+        analyzer.use_polars = use_polars and HAVE_POLARS
+        analyzer._categorical_ids = False
+        return analyzer
+    
+    @property
+    def raw_feed(self) -> ptg.gtfs.Feed:
+        """The feed with every value kept as the text in the GTFS files"""
+        return self._raw_feed
+    
+    def _use_categorical_ids(self) -> None:
+        """
+        Store the ID columns of trips and stop_times as pandas categoricals.
+        
+        groupby/isin/merge then hash integer codes instead of Python strings.
+        Both tables share one trip_id dtype so joining them works on the codes.
+        Runs once, the first time an analysis needs the large tables.
+        
+        Note that this replaces the tables on self.feed, so after any analysis
+        self.feed.trips and self.feed.stop_times hold categorical trip_id,
+        route_id and stop_id columns rather than strings.
+        """
+        if self._categorical_ids:
+            return
+        
+        trips = self.feed.trips
+        stop_times = self.feed.stop_times
+        trip_dtype = pd.CategoricalDtype(
+            pd.Index(trips['trip_id']).append(pd.Index(stop_times['trip_id'])).unique()
+        )
+        self.feed.set('trips.txt', trips.assign(
+            trip_id=trips['trip_id'].astype(trip_dtype),
+            route_id=trips['route_id'].astype('category'),
+        ))
+        self.feed.set('stop_times.txt', stop_times.assign(
+            trip_id=stop_times['trip_id'].astype(trip_dtype),
+            stop_id=stop_times['stop_id'].astype('category'),
+        ))
+        self._categorical_ids = True
         
     def analyze_stop_metrics(self, output_dir: str = "analysis") -> Dict[str, pd.DataFrame]:
         """
@@ -92,53 +264,78 @@ class GTFSAnalyzer:
         """
         # Create output directory if it doesn't exist
         Path(output_dir).mkdir(parents=True, exist_ok=True)
+        self._use_categorical_ids()
         
-        results = {
-            'stops_by_trips': (
-                self.feed.stop_times
-                .groupby('stop_id')['trip_id']
-                .nunique()
-                .reset_index(name='trip_count')
-                .merge(self.feed.stops[['stop_id', 'stop_name']], on='stop_id')
-                .sort_values('trip_count', ascending=False)
-            ),
-            'stops_by_routes': (
-                self.feed.stop_times
-                .merge(self.feed.trips[['trip_id', 'route_id']], on='trip_id')
-                .groupby('stop_id')['route_id']
-                .nunique()
-                .reset_index(name='route_count')
-                .merge(self.feed.stops[['stop_id', 'stop_name']], on='stop_id')
-                .sort_values('route_count', ascending=False)
-            ),
-            'routes_by_trips': (
-                self.feed.trips
-                .groupby('route_id')
-                .size()
-                .reset_index(name='trip_count')
-                .merge(
-                    self.feed.routes[['route_id', 'route_short_name', 'route_long_name']], 
-                    on='route_id'
-                )
-                .sort_values('trip_count', ascending=False)
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            # Route counts only need trips and routes, so they are computed
+            # while the stop metrics run; pandas releases the GIL in its kernels
+            routes_by_trips = executor.submit(self._routes_by_trips)
+            
+            counts = self._stop_counts().merge(
+                self.feed.stops[['stop_id', 'stop_name']], on='stop_id'
             )
-        }
-        
-        # Save results to CSV
-        for name, df in results.items():
-            df.to_csv(f"{output_dir}/{name}.csv", index=False)
+            
+            results = {
+                'stops_by_trips': (
+                    counts[['stop_id', 'trip_count', 'stop_name']]
+                    .sort_values('trip_count', ascending=False)
+                ),
+                'stops_by_routes': (
+                    counts.loc[
+                        counts['route_count'] > 0,
+                        ['stop_id', 'route_count', 'stop_name']
+                    ]
+                    .sort_values('route_count', ascending=False)
+                ),
+                'routes_by_trips': routes_by_trips.result()
+            }
+            
+            # Save results to CSV; pyarrow's writer releases the GIL, so the
+            # three files are encoded in parallel
+            list(executor.map(
+                lambda item: Path(output_dir, f"{item[0]}.csv").write_bytes(_to_csv_bytes(item[1])),
+                results.items()
+            ))
             
         return results
 
-    def subset_by_min_trips(self, min_trips: int) -> Set[str]:
+    def _stop_counts(self) -> pd.DataFrame:
+        """
+        Distinct trips and routes serving each stop, ordered by stop_id.
+        
+        Expects the categorical IDs from _use_categorical_ids, so the counts
+        run on the shared trip_id codes.
+        """
+        return stop_counts(
+            self.feed.stop_times[['stop_id', 'trip_id']],
+            self.feed.trips[['trip_id', 'route_id']],
+            self.use_polars
+        ).reset_index()
+
+    def _routes_by_trips(self) -> pd.DataFrame:
+        """Routes ranked by their number of trips"""
+        return (
+            self.feed.trips['route_id']
+            .value_counts()
+            .rename_axis('route_id')
+            .reset_index(name='trip_count')
+            .merge(
+                self.feed.routes[['route_id', 'route_short_name', 'route_long_name']], 
+                on='route_id'
+            )
+            .sort_values('trip_count', ascending=False)
+        )
+
+    def subset_by_min_trips(self, min_trips: int) -> pd.Index:
         """Get trips from routes that have at least min_trips trips"""
-        route_trip_counts = self.feed.trips.groupby('route_id').size()
+        self._use_categorical_ids()
+        route_trip_counts = self.feed.trips.groupby('route_id', observed=True).size()
         qualifying_routes = route_trip_counts[route_trip_counts >= min_trips].index
         
-        return set(
-            self.feed.trips[
-                self.feed.trips['route_id'].isin(qualifying_routes)
-            ]['trip_id']
+        return pd.Index(
+            self.feed.trips.loc[
+                self.feed.trips['route_id'].isin(qualifying_routes), 'trip_id'
+            ].unique()
         )
 
     def create_subset(self, 
@@ -162,126 +359,127 @@ class GTFSAnalyzer:
         min_trips : int, optional
             Minimum number of trips a route must have to be included
         """
-        qualifying_trips = set()
-        stops_to_keep = set()
+        self._use_categorical_ids()
+        
+        # Trip and stop IDs are kept as pandas Index objects so that all set
+        # operations run on hashtables in C instead of Python sets
+        qualifying_trips = pd.Index([])
+        stops_to_keep = pd.Index([])
         
         # First handle route patterns if specified
         if route_patterns and len(route_patterns) > 0:
-            for pattern in route_patterns:
-                if '*' in pattern:
-                    # Wildcard pattern, use regex match
-                    matching_routes = self.feed.routes[
-                        self.feed.routes['route_short_name'].str.match(
-                            pattern.replace('*', '.*'),
-                            na=False
-                        )
-                    ]['route_id']
-                else:
-                    # Exact match
-                    matching_routes = self.feed.routes[
-                        self.feed.routes['route_short_name'].str.fullmatch(pattern, na=False)
-                    ]['route_id']
-                qualifying_trips.update(
-                    self.feed.trips[
-                        self.feed.trips['route_id'].isin(matching_routes)
-                    ]['trip_id']
-                )
+            # Trailing-wildcard patterns ("138*") are plain prefix checks and
+            # patterns without wildcards are exact names; both avoid the regex
+            # engine. Only wildcards inside a pattern are combined into one regex.
+            route_names = self.feed.routes['route_short_name']
+            prefixes = tuple(
+                pattern[:-1] for pattern in route_patterns
+                if pattern.endswith('*') and '*' not in pattern[:-1]
+            )
+            exact = [pattern for pattern in route_patterns if '*' not in pattern]
+            wildcards = tuple(
+                pattern for pattern in route_patterns
+                if '*' in pattern[:-1]
+            )
+            
+            mask = route_names.isin(exact)
+            if prefixes:
+                mask |= route_names.str.startswith(prefixes, na=False)
+            if wildcards:
+                mask |= route_names.str.match(_wildcard_regex(wildcards), na=False)
+            matching_routes = self.feed.routes.loc[mask, 'route_id']
+            qualifying_trips = qualifying_trips.union(
+                self.feed.trips.loc[
+                    self.feed.trips['route_id'].isin(matching_routes), 'trip_id'
+                ].unique()
+            )
 
             # If only routes specified, get only stops served by these routes
             if not stop_ids:
-                stops_to_keep.update(
-                    self.feed.stop_times[
-                        self.feed.stop_times['trip_id'].isin(qualifying_trips)
-                    ]['stop_id']
+                stops_to_keep = stops_to_keep.union(
+                    self.feed.stop_times.loc[
+                        self.feed.stop_times['trip_id'].isin(qualifying_trips), 'stop_id'
+                    ].unique()
                 )
         
         # Then handle stops if specified
         if stop_ids and len(stop_ids) > 0:
             # Get all trips that serve these stops
-            stop_trips = set(
-                self.feed.stop_times[
-                    self.feed.stop_times['stop_id'].isin(stop_ids)
-                ]['trip_id']
+            stop_trips = pd.Index(
+                self.feed.stop_times.loc[
+                    self.feed.stop_times['stop_id'].isin(stop_ids), 'trip_id'
+                ].unique()
             )
-            qualifying_trips.update(stop_trips)
+            qualifying_trips = qualifying_trips.union(stop_trips)
             
             # Get all stops served by these trips (not just the specified stops)
-            stops_to_keep.update(
-                self.feed.stop_times[
-                    self.feed.stop_times['trip_id'].isin(stop_trips)
-                ]['stop_id']
+            stops_to_keep = stops_to_keep.union(
+                self.feed.stop_times.loc[
+                    self.feed.stop_times['trip_id'].isin(stop_trips), 'stop_id'
+                ].unique()
             )
         
         # If neither stops nor routes specified, use all trips and stops
-        if not qualifying_trips:
-            qualifying_trips = set(self.feed.trips['trip_id'])
-            stops_to_keep = set(self.feed.stops['stop_id'])
+        if qualifying_trips.empty:
+            qualifying_trips = pd.Index(self.feed.trips['trip_id'])
+            stops_to_keep = pd.Index(self.feed.stops['stop_id'])
         
         # Apply minimum trips filter if specified
         if min_trips:
-            qualifying_trips &= self.subset_by_min_trips(min_trips)
+            qualifying_trips = qualifying_trips.intersection(
+                self.subset_by_min_trips(min_trips)
+            )
             
         # Get routes to keep
-        routes_to_keep = set(self.feed.trips[
-            self.feed.trips['trip_id'].isin(qualifying_trips)
-        ]['route_id'])
+        routes_to_keep = self.feed.trips.loc[
+            self.feed.trips['trip_id'].isin(qualifying_trips), 'route_id'
+        ].unique()
         
-        # Create a temporary directory for the new feed
-        import tempfile
-        import shutil
-        import os
-        from zipfile import ZipFile
+        from zipfile import ZipFile, ZIP_STORED
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Extract the original feed
-            with ZipFile(self.feed_path, 'r') as zip_ref:
-                zip_ref.extractall(tmpdir)
-            
-            # Save the filtered routes with colors
-            filtered_routes = self.feed.routes[
-                self.feed.routes['route_id'].isin(routes_to_keep)
-            ].copy()
-            color_mapping = self.apply_route_colors_to_df(filtered_routes)
-            filtered_routes.to_csv(os.path.join(tmpdir, 'routes.txt'), index=False)
-            
-            # Create the view spec for other files
-            view = {
-                'trips.txt': {'trip_id': list(qualifying_trips)},
-                'stops.txt': {'stop_id': list(stops_to_keep)} if stops_to_keep else None
-            }
-            
-            # Filter out None values from view
-            view = {k: v for k, v in view.items() if v is not None}
-            
-            # Create temporary subset
-            temp_output = os.path.join(tmpdir, 'temp_subset.zip')
-            ptg.extract_feed(
-                self.feed_path,
-                temp_output,
-                view
-            )
-            
-            # Extract the temporary subset
-            subset_dir = os.path.join(tmpdir, 'subset')
-            os.makedirs(subset_dir, exist_ok=True)
-            with ZipFile(temp_output, 'r') as zip_ref:
-                zip_ref.extractall(subset_dir)
-            
-            # Copy our modified routes.txt to the subset
-            shutil.copy(
-                os.path.join(tmpdir, 'routes.txt'),
-                os.path.join(subset_dir, 'routes.txt')
-            )
-            
-            # Create the final zip with all files including modified routes.txt
-            with ZipFile(output_path, 'w') as zip_ref:
-                for root, _, files in os.walk(subset_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, subset_dir)
-                        zip_ref.write(file_path, arcname)
+        # Save the filtered routes with colors
+        filtered_routes = self.feed.routes[
+            self.feed.routes['route_id'].isin(routes_to_keep)
+        ].copy()
+        color_mapping = self.apply_route_colors_to_df(filtered_routes)
         
-        return GTFSAnalyzer(output_path)
+        # Create the view spec for other files. partridge flattens any iterable
+        # into its own set, so the Index objects are passed without a list copy
+        view = {
+            'trips.txt': {'trip_id': qualifying_trips},
+            'stops.txt': {'stop_id': stops_to_keep} if not stops_to_keep.empty else None
+        }
+        
+        # Filter out None values from view
+        view = {k: v for k, v in view.items() if v is not None}
+        
+        # Filter the raw tables already parsed for this feed, layering one
+        # view per file exactly like ptg.load_feed(path, view) would, so every
+        # value is written back verbatim without reading the zip again
+        config = _raw_config()
+        subset_feed = self._raw_feed
+        for filename, column_filters in view.items():
+            config = reroot_graph(config, filename)
+            subset_feed = ptg.gtfs.Feed(subset_feed, {filename: column_filters}, config)
+        subset_feed = ptg.gtfs.Feed(subset_feed, config=_raw_config())
+        subset_feed.set('routes.txt', filtered_routes)
+        
+        # Write every non-empty table, with our colored routes.txt. Members
+        # stay stored (uncompressed) as before, through a 1 MiB file buffer.
+        with open(output_path, 'wb', buffering=1 << 20) as fh, \
+                ZipFile(fh, 'w', compression=ZIP_STORED) as dst:
+            for filename in default_config().nodes():
+                df = subset_feed.get(filename)
+                if filename == 'routes.txt' or not df.empty:
+                    dst.writestr(filename, _to_csv_bytes(df))
+        
+        # The subset analyzer reads from the tables already in memory,
+        # converting types on access just like loading output_path would
+        return type(self)._from_feed(
+            output_path,
+            subset_feed,
+            use_polars=self.use_polars
+        )
 
     def apply_route_colors_to_df(self, routes_df: pd.DataFrame, cmap: str = 'tab20c') -> Dict[str, str]:
         """
@@ -289,7 +487,7 @@ class GTFSAnalyzer:
         Routes are naturally sorted by route_short_name before color assignment.
         Colors are stored without the '#' prefix and in uppercase.
         """
-        import matplotlib.pyplot as plt
+        from matplotlib import colormaps
         import numpy as np
         
         # Get route names and IDs as numpy arrays
@@ -303,25 +501,23 @@ class GTFSAnalyzer:
         route_ids = route_ids[sorted_idx]
         
         # Generate colors vectorized
-        colormap = plt.get_cmap(cmap)
+        colormap = colormaps[cmap]
         colors_rgba = colormap(np.linspace(0, 1, len(route_ids)))
         
         # Convert to hex colors using numpy operations
-        colors_rgb = (colors_rgba[:, :3] * 255).astype(np.uint8)
-        hex_colors = np.apply_along_axis(
-            lambda x: f'{x[0]:02X}{x[1]:02X}{x[2]:02X}', 1, colors_rgb  # Note: uppercase hex without #
-        )
+        colors_rgb = (colors_rgba[:, :3] * 255).astype(np.uint8).astype(np.uint32)
+        packed = (colors_rgb[:, 0] << 16) | (colors_rgb[:, 1] << 8) | colors_rgb[:, 2]
+        hex_colors = np.char.mod('%06X', packed)  # Note: uppercase hex without #
         
         # Create the mapping
         color_mapping = dict(zip(route_ids, hex_colors))
         
-        # Update the routes DataFrame with new colors
-        routes_df['route_color'] = (
-            routes_df['route_id']
-            .map(color_mapping)
-            .fillna('')
-            .astype(str)  # Convert to string type
-        )
+        # Update the routes DataFrame with new colors. hex_colors[k] belongs to
+        # row sorted_idx[k], so scatter them back into row order instead of
+        # looking every route up in the mapping.
+        route_colors = np.empty_like(hex_colors)
+        route_colors[sorted_idx] = hex_colors
+        routes_df['route_color'] = route_colors
         routes_df['route_text_color'] = 'FFFFFF'  # White text for contrast
         
         print(f"Successfully set colors for {routes_df['route_color'].ne('').sum()} routes", file=sys.stderr)
@@ -49,15 +49,176 @@ Author: ಪವನ ಕುಮಾರ ​| Pavan Kumar, PhD (@pvnkmrksk)
 
 import pandas as pd
 import folium
-from pathlib import Path
 import zipfile
-import tempfile
+import posixpath
+import shutil
+import csv
+import gzip
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from branca.colormap import LinearColormap
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap, to_hex
+from matplotlib import colormaps
+from matplotlib.colors import LinearSegmentedColormap
+
+from gtfs_utils import HAVE_POLARS, file_fingerprint, stop_counts
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+try:
+    from isal import igzip
+    HAVE_ISAL = True
+except ImportError:
+    HAVE_ISAL = False
+
+# Columns of _USECOLS always read as text: IDs and route names may be
+# numeric with leading zeros
+_STRING_COLUMNS = ('stop_id', 'trip_id', 'route_id', 'shape_id', 'route_short_name')
+
+# Columns the map uses from each table; the rest are never parsed
+_USECOLS = {
+    'stops.txt': ('stop_id', 'stop_name', 'stop_lat', 'stop_lon'),
+    'routes.txt': ('route_id', 'route_short_name', 'route_long_name'),
+    'trips.txt': ('trip_id', 'route_id', 'shape_id'),
+    'stop_times.txt': ('trip_id', 'stop_id'),
+    'shapes.txt': ('shape_id', 'shape_pt_lat', 'shape_pt_lon', 'shape_pt_sequence'),
+}
+
+# Parse in 8 MiB blocks: large stop_times files split into fewer, bigger
+# chunks for the reader threads than with pyarrow's 1 MiB default
+_CSV_BLOCK_SIZE = 8 << 20
+
+def _read_gtfs_csv(source, encoding='utf-8', usecols=None):
+    """Read a GTFS table, using pyarrow's multithreaded parser when available"""
+    if HAVE_PYARROW:
+        table = pacsv.read_csv(
+            source,
+            read_options=pacsv.ReadOptions(encoding=encoding, block_size=_CSV_BLOCK_SIZE),
+            convert_options=pacsv.ConvertOptions(
+                column_types={column: pa.string() for column in _STRING_COLUMNS},
+                include_columns=usecols,
+            ),
+        )
+        # pyarrow keeps undecodable text as binary instead of failing like pandas
+        if any(pa.types.is_binary(field.type) for field in table.schema):
+            raise ValueError(f"Table is not valid {encoding} text")
+        return table.to_pandas()
+    return pd.read_csv(
+        source,
+        encoding=encoding,
+        usecols=usecols,
+        dtype={column: str for column in _STRING_COLUMNS},
+    )
+
+@lru_cache(maxsize=32)
+def _cmap_hex(name, n):
+    """
+    Sample n evenly spaced colors of a matplotlib colormap as '#rrggbb' strings.
+    
+    Cached per (name, n), so the result is an immutable tuple.
+    """
+    rgba = colormaps[name](np.linspace(0, 1, n))
+    rgb = np.rint(rgba[:, :3] * 255).astype(np.uint32)
+    packed = (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    return tuple(f'#{v:06x}' for v in packed.tolist())
+
+def _colormap_hex(colormap, values):
+    """
+    Evaluate a branca LinearColormap for an array of values at once.
+    
+    Mirrors LinearColormap.rgba_floats_tuple and rgba_hex_str, returning the
+    same '#rrggbbaa' strings as calling the colormap on each value.
+    """
+    index = np.asarray(colormap.index, dtype=float)
+    colors = np.asarray(colormap.colors, dtype=float)
+    x = np.asarray(values, dtype=float)
+    
+    # Segment i has index[i - 1] < x <= index[i]
+    i = np.clip(np.searchsorted(index, x, side='left'), 1, len(index) - 1)
+    low, high = index[i - 1], index[i]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(low < high, (x - low) * 1.0 / (high - low), 1.0)[:, None]
+    rgba = (1.0 - p) * colors[i - 1] + p * colors[i]
+    rgba[x >= index[-1]] = colors[-1]
+    rgba[x <= index[0]] = colors[0]
+    
+    channels = (rgba * 255.9999).astype(np.uint32)
+    packed = (
+        (channels[:, 0] << 24) | (channels[:, 1] << 16)
+        | (channels[:, 2] << 8) | channels[:, 3]
+    )
+    return [f'#{v:08x}' for v in packed.tolist()]
+
+# Stop popups are built in the browser from each feature's properties, so the
+# HTML template is embedded once instead of once per stop
+_STOP_POPUP_JS = """
+function(feature, layer) {
+    layer.bindPopup(function() {
+        var stop = feature.properties;
+        return '<div style="font-family: Arial, sans-serif;">'
+            + '<strong>' + stop.name + '</strong><br>'
+            + '<small>ID: ' + stop.id + '</small><br>'
+            + '<hr style="margin: 5px 0;">'
+            + '<span style="color: #666;">'
+            + 'Trips: ' + stop.trips + '<br>'
+            + 'Routes: ' + stop.routes
+            + '</span></div>';
+    }, {maxWidth: 200});
+}
+"""
+
+def _simplify_line(points, tolerance):
+    """
+    Simplify a polyline with the Ramer-Douglas-Peucker algorithm.
+    
+    Iterative, with the point distances of each span computed in NumPy.
+    Returns the kept rows of points, always including both end points.
+    """
+    n = len(points)
+    if n < 3 or not tolerance:
+        return points
+    
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        
+        # Distance of the inner points from the line through start and end
+        segment = points[end] - points[start]
+        offsets = points[start + 1:end] - points[start]
+        length = np.hypot(segment[0], segment[1])
+        if length > 0:
+            dist = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+        else:
+            dist = np.hypot(offsets[:, 0], offsets[:, 1])
+        
+        farthest = int(dist.argmax())
+        if dist[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    
+    return points[keep]
+
+def _write_gzip_copy(path):
+    """Write a gzip-compressed copy of a file next to it as <path>.gz"""
+    if HAVE_ISAL:
+        compressed = igzip.open(f"{path}.gz", 'wb', compresslevel=3)
+    else:
+        compressed = gzip.open(f"{path}.gz", 'wb', compresslevel=6)
+    with open(path, 'rb') as src, compressed:
+        shutil.copyfileobj(src, compressed, 1 << 20)
 
 class GTFSMapCreator:
     """
@@ -86,13 +247,15 @@ class GTFSMapCreator:
         ... )
     """
 
-    def __init__(self, gtfs_path):
+    def __init__(self, gtfs_path, use_polars=True):
         self.gtfs_path = gtfs_path
+        self.use_polars = use_polars and HAVE_POLARS
         self.stops_df = None
         self.routes_df = None
         self.trips_df = None
         self.stop_times_df = None
         self.shapes_df = None
+        self._stop_metrics = None
         
     def validate_gtfs_file(self):
         """Validate if the file is a valid GTFS zip and contains required files"""
@@ -111,62 +274,146 @@ class GTFSMapCreator:
             sys.exit(1)
 
         try:
+            # Read the tables straight from the archive, without extracting to disk
             with zipfile.ZipFile(self.gtfs_path, 'r') as zip_ref:
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    zip_ref.extractall(tmpdir)
-                    
-                    # Find stops.txt recursively
-                    stops_path = next(Path(tmpdir).rglob('stops.txt'))
-                    gtfs_base_dir = stops_path.parent
+                # Resolve tables by lowercase file name at any depth
+                members = {}
+                for name in zip_ref.namelist():
+                    members.setdefault(posixpath.basename(name).lower(), name)
+                
+                def read(filename, encoding='utf-8'):
+                    with zip_ref.open(members[filename]) as f:
+                        # Optional columns (e.g. shape_id) may be absent, so only
+                        # request the wanted columns the header actually has
+                        header = f.readline().decode(encoding).lstrip('\ufeff')
+                        usecols = [
+                            column for column in next(csv.reader([header]), [])
+                            if column in _USECOLS[filename]
+                        ]
+                        f.seek(0)
+                        return _read_gtfs_csv(f, encoding, usecols)
+                
+                try:
+                    # Parse the tables concurrently; the CSV readers release
+                    # the GIL, and ZipFile serialises the underlying reads
+                    with ThreadPoolExecutor(max_workers=len(_USECOLS)) as executor:
+                        tables = {
+                            filename: executor.submit(read, filename)
+                            for filename in _USECOLS
+                        }
+                    self.stops_df = tables['stops.txt'].result()
+                    self.routes_df = tables['routes.txt'].result()
+                    self.trips_df = tables['trips.txt'].result()
+                    self.stop_times_df = tables['stop_times.txt'].result()
                     
                     try:
-                        self.stops_df = pd.read_csv(stops_path)
-                        self.routes_df = pd.read_csv(gtfs_base_dir / 'routes.txt')
-                        self.trips_df = pd.read_csv(gtfs_base_dir / 'trips.txt')
-                        self.stop_times_df = pd.read_csv(gtfs_base_dir / 'stop_times.txt')
+                        self.shapes_df = tables['shapes.txt'].result()
+                    except:
+                        self.shapes_df = None
                         
+                except Exception as e:
+                    # Try different encodings if default fails
+                    for encoding in ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']:
                         try:
-                            self.shapes_df = pd.read_csv(gtfs_base_dir / 'shapes.txt')
+                            self.stops_df = read('stops.txt', encoding)
+                            break
                         except:
-                            self.shapes_df = None
-                            
-                    except Exception as e:
-                        # Try different encodings if default fails
-                        for encoding in ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']:
-                            try:
-                                self.stops_df = pd.read_csv(stops_path, encoding=encoding)
-                                break
-                            except:
-                                continue
-                        if self.stops_df is None:
-                            raise Exception("Could not read stops.txt with any encoding")
+                            continue
+                    if self.stops_df is None:
+                        raise Exception("Could not read stops.txt with any encoding")
                         
         except Exception as e:
             print(f"Error loading GTFS data: {str(e)}")
             sys.exit(1)
+        
+        if self.stop_times_df is not None:
+            self._prepare_tables()
+    
+    def load_feed(self, feed):
+        """
+        Load the tables from a partridge feed already in memory.
+        
+        Use instead of load_gtfs_data when the feed has just been built, e.g.
+        the raw_feed of a GTFSAnalyzer subset, to skip re-reading the zip.
+        A raw (all text) feed gives exactly the tables load_gtfs_data would
+        read; typed feeds work too, with partridge's numeric parsing.
+        """
+        tables = {}
+        for filename, columns in _USECOLS.items():
+            df = feed.get(filename)
+            tables[filename] = df[[column for column in columns if column in df.columns]].copy()
+        
+        self.stops_df = tables['stops.txt']
+        self.routes_df = tables['routes.txt']
+        self.trips_df = tables['trips.txt']
+        self.stop_times_df = tables['stop_times.txt']
+        # A missing shapes.txt is an empty table in partridge
+        self.shapes_df = tables['shapes.txt'] if not tables['shapes.txt'].empty else None
+        
+        for df, columns in ((self.stops_df, ('stop_lat', 'stop_lon')),
+                            (self.shapes_df, ('shape_pt_lat', 'shape_pt_lon'))):
+            if df is not None:
+                for column in columns:
+                    # astype parses text exactly, like the CSV readers do
+                    df[column] = df[column].astype('float64')
+        self._prepare_tables()
+    
+    def _prepare_tables(self):
+        """Compact the loaded tables before any metrics are computed"""
+        # Sequence numbers fit in much narrower integers than int64
+        if self.shapes_df is not None:
+            self.shapes_df['shape_pt_sequence'] = pd.to_numeric(
+                self.shapes_df['shape_pt_sequence'], downcast='unsigned'
+            )
+        self._use_categorical_ids()
+    
+    def _use_categorical_ids(self):
+        """
+        Store the ID columns as pandas categoricals.
+        
+        Every table referencing an ID shares one dtype, so groupby and merge
+        hash integer codes instead of Python strings.
+        """
+        tables = [
+            ('stop_id', [self.stops_df, self.stop_times_df]),
+            ('trip_id', [self.trips_df, self.stop_times_df]),
+            ('route_id', [self.routes_df, self.trips_df]),
+            ('shape_id', [self.trips_df, self.shapes_df]),
+        ]
+        for column, dfs in tables:
+            dfs = [df for df in dfs if df is not None and column in df.columns]
+            # Optional columns such as shape_id may be missing everywhere
+            if not dfs:
+                continue
+            ids = pd.Index(pd.concat([df[column] for df in dfs], ignore_index=True))
+            dtype = pd.CategoricalDtype(ids.dropna().unique())
+            for df in dfs:
+                df[column] = df[column].astype(dtype)
     
     def calculate_stop_metrics(self):
-        """Calculate trip and route counts for each stop"""
-        trip_counts = (
-            self.stop_times_df
-            .groupby('stop_id')['trip_id']
-            .nunique()
-        )
+        """
+        Calculate trip and route counts for each stop.
         
-        route_counts = (
-            self.stop_times_df
-            .merge(self.trips_df[['trip_id', 'route_id']], on='trip_id')
-            .groupby('stop_id')['route_id']
-            .nunique()
-        )
+        The result is cached until stop_times_df or trips_df is replaced, so
+        repeated create_map calls (other colormaps, stops only) reuse it.
+        """
+        if self._stop_metrics is not None:
+            stop_times_df, trips_df, metrics = self._stop_metrics
+            if stop_times_df is self.stop_times_df and trips_df is self.trips_df:
+                return metrics
         
-        return pd.DataFrame({
-            'trip_count': trip_counts,
-            'route_count': route_counts
-        }).fillna(0)
+        metrics = stop_counts(
+            self.stop_times_df[['stop_id', 'trip_id']],
+            self.trips_df[['trip_id', 'route_id']],
+            self.use_polars,
+            sort=False
+        )
+        self._stop_metrics = (self.stop_times_df, self.trips_df, metrics)
+        return metrics
 
     def create_map(self, output_path=None, stops_only=False, 
-                  color_by='trips', cmap='magma', route_cmap='magma', **kwargs):
+                  color_by='trips', cmap='magma', route_cmap='magma',
+                  simplify_tolerance=None, gzip_output=False, **kwargs):
         """
         Create an interactive map with stops and routes.
         
@@ -176,6 +423,11 @@ class GTFSMapCreator:
             color_by (str): 'trips' or 'routes' - metric to use for coloring stops
             cmap (str): Matplotlib colormap name for stops (e.g., 'magma', 'viridis', 'YlOrRd')
             route_cmap (str): Matplotlib colormap name for routes
+            simplify_tolerance (float, optional): Simplify route shapes with
+                Ramer-Douglas-Peucker to this tolerance in degrees. By default
+                every shape point is kept
+            gzip_output (bool): Also write a precompressed <output_path>.gz
+                for web servers that serve gzip files directly
         
         Example usage:
             creator.create_map(
@@ -196,8 +448,7 @@ class GTFSMapCreator:
         vmin, vmax = metric_values.min(), metric_values.max()
 
         # Get colors from matplotlib colormap
-        mpl_cmap = plt.get_cmap(cmap)
-        colors = [to_hex(mpl_cmap(i)) for i in np.linspace(0, 1, 7)]
+        colors = list(_cmap_hex(cmap, 7))
         
         colormap = LinearColormap(
             colors=colors,
@@ -217,72 +468,116 @@ class GTFSMapCreator:
         # Add routes
         if self.shapes_df is not None and not stops_only:
             routes_group = folium.FeatureGroup(name='Routes', show=True)
-            route_freqs = self.trips_df['route_id'].value_counts()
-            max_freq = route_freqs.max()
+            # Plain dict so the per-shape lookup is a hash probe, not a pandas label lookup
+            route_freqs = self.trips_df['route_id'].value_counts().to_dict()
+            max_freq = max(route_freqs.values())
             
             # Get route colors from matplotlib
-            route_mpl_cmap = plt.get_cmap(route_cmap)
-            route_colors = [to_hex(route_mpl_cmap(i)) for i in np.linspace(0, 1, 5)]
+            route_colors = _cmap_hex(route_cmap, 5)
             
-            for shape_id in self.shapes_df['shape_id'].unique():
-                shape_points = (
-                    self.shapes_df[self.shapes_df['shape_id'] == shape_id]
-                    .sort_values('shape_pt_sequence')
-                )
-                
-                route_id = self.trips_df[
-                    self.trips_df['shape_id'] == shape_id
-                ]['route_id'].iloc[0]
-                freq_ratio = route_freqs.get(route_id, 1) / max_freq
-                
-                color_idx = int(freq_ratio * (len(route_colors) - 1))
-                route_color = route_colors[color_idx]
-                
-                points = [[row['shape_pt_lat'], row['shape_pt_lon']] 
-                         for idx, row in shape_points.iterrows()]
+            # Number the shapes in order of appearance, then sort the points
+            # by (number, sequence) once so every shape is a contiguous run
+            # found by searchsorted on integer codes
+            codes, shape_ids = pd.factorize(self.shapes_df['shape_id'])
+            order = np.lexsort((self.shapes_df['shape_pt_sequence'].to_numpy(), codes))
+            coords = np.column_stack((
+                self.shapes_df['shape_pt_lon'].to_numpy()[order],
+                self.shapes_df['shape_pt_lat'].to_numpy()[order],
+            ))
+            bounds = np.searchsorted(codes[order], np.arange(len(shape_ids) + 1)).tolist()
+            
+            # Route of the first trip using each shape
+            shape_to_route = dict(
+                self.trips_df.drop_duplicates('shape_id')[['shape_id', 'route_id']]
+                .itertuples(index=False, name=None)
+            )
+            
+            # Bind the names used per shape to locals outside the loop
+            get_route = shape_to_route.get
+            get_freq = route_freqs.get
+            last_color = len(route_colors) - 1
+            
+            # All shapes go into one GeoJSON layer instead of a PolyLine object
+            # per shape, styled per feature like the stops below
+            features = []
+            add_feature = features.append
+            for code, shape_id in enumerate(shape_ids.tolist()):
+                start, end = bounds[code], bounds[code + 1]
+                freq_ratio = get_freq(get_route(shape_id), 1) / max_freq
+                route_color = route_colors[int(freq_ratio * last_color)]
                 
-                folium.PolyLine(
-                    points,
-                    weight=2 + freq_ratio * 4,
-                    color=route_color,
-                    opacity=0.7,
-                    smooth_factor=1.5
-                ).add_to(routes_group)
+                add_feature({
+                    'type': 'Feature',
+                    'geometry': {
+                        'type': 'LineString',
+                        'coordinates': _simplify_line(coords[start:end], simplify_tolerance).tolist(),
+                    },
+                    'properties': {
+                        'style': {
+                            'color': route_color,
+                            'weight': 2 + freq_ratio * 4,
+                            'opacity': 0.7,
+                        },
+                    },
+                })
+            
+            folium.GeoJson(
+                {'type': 'FeatureCollection', 'features': features},
+                smooth_factor=1.5
+            ).add_to(routes_group)
             
             routes_group.add_to(m)
         
         # Add stops to the map
         stops_group = folium.FeatureGroup(name='Stops', show=True)
-        for idx, stop in self.stops_df.iterrows():
-            metric_value = metrics.loc[stop['stop_id'], metric_name] if stop['stop_id'] in metrics.index else 0
-            color = colormap(metric_value)
-            
-            # Calculate size based on metric (with smaller range)
-            size_ratio = metric_value / vmax if vmax > 0 else 0
-            radius = 4 + size_ratio * 8  # Smaller size range
-            
-            folium.CircleMarker(
-                location=[stop['stop_lat'], stop['stop_lon']],
-                radius=radius,
-                color=color,
+        
+        # Align metrics with the stops once instead of a .loc lookup per stop
+        stop_metrics = metrics.reindex(self.stops_df['stop_id'], fill_value=0)
+        values = stop_metrics[metric_name].to_numpy()
+        
+        # Size based on metric (with smaller range)
+        size_ratios = values / vmax if vmax > 0 else np.zeros(len(values))
+        radii = (4 + size_ratios * 8).tolist()
+        
+        # Colors for all stops in one vectorized colormap evaluation
+        colors = _colormap_hex(colormap, values)
+        
+        # All stops go into one GeoJSON layer instead of a CircleMarker and
+        # Popup object per stop. folium applies properties.style through
+        # setStyle, which also sets the circle radius.
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [stop_lon, stop_lat]},
+                'properties': {
+                    'style': {'color': color, 'fillColor': color, 'radius': radius},
+                    'name': stop_name,
+                    'id': stop_id,
+                    'trips': trip_count,
+                    'routes': route_count,
+                },
+            }
+            for stop_id, stop_name, stop_lat, stop_lon, color, radius, trip_count, route_count in zip(
+                self.stops_df['stop_id'].tolist(),
+                self.stops_df['stop_name'].tolist(),
+                self.stops_df['stop_lat'].tolist(),
+                self.stops_df['stop_lon'].tolist(),
+                colors,
+                radii,
+                stop_metrics['trip_count'].tolist(),
+                stop_metrics['route_count'].tolist(),
+            )
+        ]
+        
+        folium.GeoJson(
+            {'type': 'FeatureCollection', 'features': features},
+            marker=folium.CircleMarker(
                 fill=True,
-                fillOpacity=0.7,
+                fill_opacity=0.7,
                 weight=1,  # Thinner border
-                popup=folium.Popup(
-                    f"""
-                    <div style="font-family: Arial, sans-serif;">
-                        <strong>{stop['stop_name']}</strong><br>
-                        <small>ID: {stop['stop_id']}</small><br>
-                        <hr style="margin: 5px 0;">
-                        <span style="color: #666;">
-                            Trips: {metrics.loc[stop['stop_id'], 'trip_count'] if stop['stop_id'] in metrics.index else 0}<br>
-                            Routes: {metrics.loc[stop['stop_id'], 'route_count'] if stop['stop_id'] in metrics.index else 0}
-                        </span>
-                    </div>
-                    """,
-                    max_width=200
-                )
-            ).add_to(stops_group)
+            ),
+            on_each_feature=folium.JsCode(_STOP_POPUP_JS),
+        ).add_to(stops_group)
         
         stops_group.add_to(m)
         
@@ -296,6 +591,8 @@ class GTFSMapCreator:
         if output_path is None:
             output_path = self.gtfs_path.replace(".zip", "_map.html")
         m.save(output_path)
+        if gzip_output:
+            _write_gzip_copy(output_path)
 
         # print(f"Map created successfully at {output_path}")
 
@@ -327,8 +624,7 @@ beautiful, readable transit maps while preserving the natural flow of routes.
     parser.add_argument('gtfs_path',
                        help='Path to the GTFS zip file')
     parser.add_argument('-o', '--output',
-                       default='transit_map.html',
-                       help='Output HTML file path (default: transit_map.html)')
+                       help='Output HTML file path (default: <input>_map.html)')
     
     # Display Options
     display_group = parser.add_argument_group('display options')
@@ -339,6 +635,19 @@ beautiful, readable transit maps while preserving the natural flow of routes.
                              choices=['trips', 'routes'],
                              default='trips',
                              help='Metric for coloring stops (default: trips)')
+    display_group.add_argument('--simplify',
+                             dest='simplify_tolerance',
+                             type=float,
+                             metavar='DEGREES',
+                             help='Simplify route shapes to this tolerance, e.g. 1e-5 '
+                                  'for about 1 m (default: keep every point)')
+    display_group.add_argument('--gzip',
+                             dest='gzip_output',
+                             action='store_true',
+                             help='Also write a gzip-compressed copy of the map (<output>.gz)')
+    display_group.add_argument('--force',
+                             action='store_true',
+                             help='Rebuild the map even if the input and options are unchanged')
     
     # Style Options
     style_group = parser.add_argument_group('style options')
@@ -385,11 +694,29 @@ For more information and documentation:
         print(f"Error: Input file '{args.gtfs_path}' does not exist", file=sys.stderr)
         sys.exit(1)
     
+    # Skip the whole pipeline when the map was already built from this input
+    # with the same options; the fingerprint sits next to the saved map
+    options = {
+        k: v for k, v in vars(args).items()
+        if k not in ('gtfs_path', 'output', 'force')
+    }
+    map_path = args.output or args.gtfs_path.replace(".zip", "_map.html")
+    meta_path = f"{map_path}.meta"
+    fingerprint = file_fingerprint(args.gtfs_path, options)
+    outputs = [map_path, meta_path] + ([f"{map_path}.gz"] if args.gzip_output else [])
+    if not args.force and all(os.path.exists(path) for path in outputs):
+        with open(meta_path) as f:
+            if f.read().strip() == fingerprint:
+                print(f"Map is up to date at {map_path}", file=sys.stderr)
+                sys.exit(0)
+    
     map_creator = GTFSMapCreator(args.gtfs_path)
     map_creator.load_gtfs_data()
-    map_creator.create_map(**vars(args))
+    map_creator.create_map(output_path=map_path, **options)
+    with open(meta_path, 'w') as f:
+        f.write(fingerprint)
     
-    print(f"Map created successfully at {args.output}", file=sys.stderr)
+    print(f"Map created successfully at {map_path}", file=sys.stderr)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
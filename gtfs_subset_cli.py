@@ -64,6 +64,7 @@ def create_subset(input_gtfs: str, *,
                  color_by: str = 'trips',
                  cmap: str = 'magma',
                  route_cmap: str = 'tab20c',
+                 cache_dir: str = None,
                  **kwargs) -> Path:
     """
     Create a filtered GTFS subset with optional map visualization.
@@ -83,6 +84,8 @@ def create_subset(input_gtfs: str, *,
         color_by (str, optional): Metric for coloring ('trips'/'routes')
         cmap (str, optional): Matplotlib colormap for stops
         route_cmap (str, optional): Matplotlib colormap for routes
+        cache_dir (str, optional): Directory for reusing parsed input tables
+            across runs
         **kwargs: Additional parameters passed to map creation
 
     Returns:
@@ -113,7 +116,7 @@ def create_subset(input_gtfs: str, *,
         ))
     
     # Create analyzer instance
-    analyzer = GTFSAnalyzer(input_gtfs)
+    analyzer = GTFSAnalyzer(input_gtfs, cache_dir=cache_dir)
     
     # Create subset (colors will be applied during subsetting)
     subset = analyzer.create_subset(
@@ -123,20 +126,24 @@ def create_subset(input_gtfs: str, *,
         min_trips=min_trips
     )
     
-    # Print statistics to stderr
-    print(f"\nSubset Statistics:", file=sys.stderr)
-    print(f"Original routes: {len(analyzer.feed.routes)}", file=sys.stderr)
-    print(f"Subset routes: {len(subset.feed.routes)}", file=sys.stderr)
-    print(f"Original trips: {len(analyzer.feed.trips)}", file=sys.stderr)
-    print(f"Subset trips: {len(subset.feed.trips)}", file=sys.stderr)
-    print(f"Original stops: {len(analyzer.feed.stops)}", file=sys.stderr)
-    print(f"Subset stops: {len(subset.feed.stops)}", file=sys.stderr)
+    # Print statistics to stderr as one write, stderr is flushed per line
+    print(
+        f"\nSubset Statistics:\n"
+        f"Original routes: {len(analyzer.feed.routes)}\n"
+        f"Subset routes: {len(subset.feed.routes)}\n"
+        f"Original trips: {len(analyzer.feed.trips)}\n"
+        f"Subset trips: {len(subset.feed.trips)}\n"
+        f"Original stops: {len(analyzer.feed.stops)}\n"
+        f"Subset stops: {len(subset.feed.stops)}",
+        file=sys.stderr
+    )
     
     # Create map if requested
     if map:
         map_path = map_output or str(Path(output).with_suffix('.html'))
+        # Map the subset tables already in memory instead of re-reading output
         map_creator = GTFSMapCreator(output)
-        map_creator.load_gtfs_data()
+        map_creator.load_feed(subset.raw_feed)
         map_creator.create_map(
             output_path=map_path,
             stops_only=stops_only,
@@ -175,6 +182,9 @@ of the resulting network.
                        help='Path to input GTFS zip file')
     parser.add_argument('-o', '--output',
                        help='Output path for filtered GTFS (default: auto-generated)')
+    parser.add_argument('--cache-dir',
+                       help='Keep the parsed input tables here as Parquet and reuse '
+                            'them while the input is unchanged')
     
     # Filtering Options
     filter_group = parser.add_argument_group('filtering options')
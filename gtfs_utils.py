@@ -0,0 +1,137 @@
+"""
+GTFS Shared Utilities
+=====================
+
+Part of the Magga (ಮಗ್ಗ) project - A transit map generation toolkit.
+"Magga" means loom in Kannada, reflecting the weaving of intricate patterns,
+much like the organic patterns of transit routes in a city.
+
+Helpers shared by the analysis and map viewer tools, kept free of their
+heavier dependencies (partridge, folium).
+
+For more information, visit: https://github.com/pvnkmrksk/magga
+
+MIT License
+
+Copyright (c) 2024 Pavan Kumar (@pvnkmrksk)
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+This work builds upon the LOOM project (https://github.com/ad-freiburg/loom)
+and is distributed under compatible terms.
+
+Author: ಪವನ ಕುಮಾರ ​| Pavan Kumar, PhD (@pvnkmrksk)
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import polars as pl
+    HAVE_POLARS = True
+except ImportError:
+    HAVE_POLARS = False
+
+def file_fingerprint(path, options=None) -> str:
+    """
+    Cheap fingerprint of a file, plus any options rendered from it.
+    
+    Hashes the file size, mtime and first 4 KiB rather than the whole file.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(4096))
+    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    if options is not None:
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+def stop_counts(stop_times: pd.DataFrame, trips: pd.DataFrame,
+                use_polars: bool = True, sort: bool = True) -> pd.DataFrame:
+    """
+    Distinct trips and routes serving each stop.
+    
+    Takes stop_times projected to stop_id/trip_id and trips projected to
+    trip_id/route_id, and returns trip_count and route_count indexed by
+    stop_id. Stops are ordered by ID with sort, else by first appearance.
+    Trips missing from trips.txt count towards trip_count only.
+    
+    With use_polars (and polars installed) categorical IDs are counted in
+    polars on their codes, provided both tables share the trip_id dtype.
+    """
+    if (
+        use_polars and HAVE_POLARS
+        and all(isinstance(stop_times[c].dtype, pd.CategoricalDtype) for c in stop_times)
+        and all(isinstance(trips[c].dtype, pd.CategoricalDtype) for c in trips)
+        and stop_times['trip_id'].dtype == trips['trip_id'].dtype
+    ):
+        return _stop_counts_polars(stop_times, trips, sort)
+    
+    # Look up each row's route instead of merging, then count both in a
+    # single grouping pass
+    trip_to_route = dict(zip(
+        trips['trip_id'].to_numpy(), trips['route_id'].to_numpy()
+    ))
+    return (
+        stop_times.assign(route_id=stop_times['trip_id'].map(trip_to_route))
+        .groupby('stop_id', observed=True, sort=sort)
+        .agg(trip_count=('trip_id', 'nunique'), route_count=('route_id', 'nunique'))
+    )
+
+def _stop_counts_polars(stop_times: pd.DataFrame, trips: pd.DataFrame,
+                        sort: bool) -> pd.DataFrame:
+    """stop_counts in polars, joining on the integer categorical codes"""
+    st = pl.DataFrame({
+        'stop_id': stop_times['stop_id'].cat.codes.to_numpy(),
+        'trip_id': stop_times['trip_id'].cat.codes.to_numpy(),
+    })
+    tr = pl.DataFrame({
+        'trip_id': trips['trip_id'].cat.codes.to_numpy(),
+        'route_id': trips['route_id'].cat.codes.to_numpy(),
+    })
+    # Missing IDs are code -1 and, as in pandas, neither form a group nor
+    # count as a distinct value
+    counts = (
+        st.lazy()
+        .filter(pl.col('stop_id') >= 0)
+        .join(tr.lazy().filter(pl.col('trip_id') >= 0), on='trip_id', how='left')
+        .group_by('stop_id', maintain_order=not sort)
+        .agg(
+            trip_count=pl.col('trip_id').filter(pl.col('trip_id') >= 0).n_unique(),
+            route_count=pl.col('route_id').filter(pl.col('route_id') >= 0).n_unique(),
+        )
+    )
+    if sort:
+        counts = counts.sort('stop_id')
+    counts = counts.collect()
+    
+    index = pd.CategoricalIndex(
+        pd.Categorical.from_codes(
+            counts['stop_id'].to_numpy(), dtype=stop_times['stop_id'].dtype
+        ),
+        name='stop_id'
+    )
+    return pd.DataFrame({
+        'trip_count': counts['trip_count'].to_numpy().astype('int64'),
+        'route_count': counts['route_count'].to_numpy().astype('int64'),
+    }, index=index)
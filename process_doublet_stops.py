@@ -6,17 +6,19 @@ import subprocess
 import os
 from gtfs_subset_cli import create_subset
 
-def process_doublet_pair(gtfs_path: str, stop_id_1: str, stop_id_2: str, stop_name: str, output_dir: Path):
-    """Process a single pair of doublet stops"""
+def process_doublet_pair(gtfs_path: str, stop_id_1: str, stop_id_2: str, stop_name: str, output_dir: Path) -> subprocess.Popen:
+    """
+    Process a single pair of doublet stops.
+    
+    The map is rendered by a background gtfs_map_viewer process, which is
+    returned so the caller can subset the next pair while it runs. The
+    caller creates output_dir/subsets once, before the first pair.
+    """
     # Create a clean name for files
     clean_name = stop_name.replace('/', '_').replace(' ', '_').lower()
     
-    # Create subset directory if it doesn't exist
-    subset_dir = output_dir / 'subsets'
-    subset_dir.mkdir(parents=True, exist_ok=True)
-    
     # Create subset GTFS focusing on these two stops
-    subset_path = subset_dir / f"{clean_name}.zip"
+    subset_path = output_dir / 'subsets' / f"{clean_name}.zip"
     create_subset(
         gtfs_path,
         output=str(subset_path),
@@ -25,7 +27,7 @@ def process_doublet_pair(gtfs_path: str, stop_id_1: str, stop_id_2: str, stop_na
     )
     
     # Generate visualization using gtfs_map_viewer
-    subprocess.run(['python', 'gtfs_map_viewer.py', str(subset_path)])
+    return subprocess.Popen(['python', 'gtfs_map_viewer.py', str(subset_path)])
 
 def main():
     import argparse
@@ -37,25 +39,40 @@ def main():
 
     # Create output directory
     output_dir = Path(args.output_dir)
-    output_dir.mkdir(exist_ok=True)
+    (output_dir / 'subsets').mkdir(parents=True, exist_ok=True)
 
     # Read doublet stops data
     doublets_df = pd.read_csv('Doublet_stops.csv', index_col=0)
     
     # Process each pair
-    for idx, row in doublets_df.iterrows():
-        print(f"\nProcessing {row['stop_name']}...")
+    pairs = zip(
+        doublets_df['stop_id_1'].to_numpy(),
+        doublets_df['stop_id_2'].to_numpy(),
+        doublets_df['stop_name'].to_numpy()
+    )
+    # At most two maps render at once: the previous pair's map overlaps
+    # with subsetting the next pair and is waited for afterwards
+    pending_map = None
+    for stop_id_1, stop_id_2, stop_name in pairs:
+        print(f"\nProcessing {stop_name}...")
         try:
-            process_doublet_pair(
+            map_process = process_doublet_pair(
                 args.gtfs_path,
-                row['stop_id_1'],
-                row['stop_id_2'],
-                row['stop_name'],
+                stop_id_1,
+                stop_id_2,
+                stop_name,
                 output_dir
             )
-            print(f"✓ Completed {row['stop_name']}")
+            print(f"✓ Completed {stop_name}")
         except Exception as e:
-            print(f"Error processing {row['stop_name']}: {e}")
+            map_process = None
+            print(f"Error processing {stop_name}: {e}")
+        if pending_map is not None:
+            pending_map.wait()
+        pending_map = map_process
+    
+    if pending_map is not None:
+        pending_map.wait()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
@@ -1,17 +1,18 @@
 import pandas as pd
 from gtfs_analysis import GTFSAnalyzer
 from pathlib import Path
-import os
 from tqdm import tqdm
 
 def main():
     # Configuration
     INPUT_GTFS = "bmtc-2.zip"
-    OUTPUT_BASE = "stop_analysis"
+    OUTPUT_BASE = Path("stop_analysis")
+    SUBSETS_DIR = OUTPUT_BASE / "subsets"
+    ANALYSIS_DIR = OUTPUT_BASE / "analysis"
     
     # Create output directories
-    Path(os.path.join(OUTPUT_BASE, "subsets")).mkdir(parents=True, exist_ok=True)
-    Path(os.path.join(OUTPUT_BASE, "analysis")).mkdir(parents=True, exist_ok=True)
+    SUBSETS_DIR.mkdir(parents=True, exist_ok=True)
+    ANALYSIS_DIR.mkdir(parents=True, exist_ok=True)
     
     # Get top 1000 stops
     print("Analyzing main GTFS feed...")
@@ -21,25 +22,23 @@ def main():
     
     # Save stops list
     top_stops[['stop_id', 'stop_name', 'trip_count']].to_csv(
-        os.path.join(OUTPUT_BASE, "stops_summary.csv"), 
+        OUTPUT_BASE / "stops_summary.csv", 
         index=False
     )
     
     # Process each stop
     print("\nProcessing stops...")
-    for _, row in tqdm(top_stops.iterrows(), total=len(top_stops), desc="Processing stops"):
-        stop_id = row['stop_id']
-        stop_name = row['stop_name']
-        
+    stops = zip(top_stops['stop_id'].to_numpy(), top_stops['stop_name'].to_numpy())
+    for stop_id, stop_name in tqdm(stops, total=len(top_stops), desc="Processing stops"):
         # Clean name for filename
         clean_name = "".join(c if c.isalnum() else "_" for c in stop_name)
         output_name = f"{stop_id}_{clean_name[:50]}"
         
-        subset_path = os.path.join(OUTPUT_BASE, "subsets", f"{output_name}.zip")
-        analysis_path = os.path.join(OUTPUT_BASE, "analysis", f"{output_name}.csv")
+        subset_path = SUBSETS_DIR / f"{output_name}.zip"
+        analysis_path = ANALYSIS_DIR / f"{output_name}.csv"
         
         # Skip if already processed
-        if os.path.exists(subset_path) and os.path.exists(analysis_path):
+        if subset_path.exists() and analysis_path.exists():
             continue
             
         try: